@@ -11,14 +11,38 @@ Usage:
 
 import os
 import re
+import mmap
 import sys
 import csv
 import argparse
+from bisect import bisect_right
 from pathlib import Path
-from dataclasses import dataclass
-from typing import List, Dict, Set, Optional
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Set, Optional, Any, Iterator, TextIO
 from datetime import datetime
 
+try:
+    import ahocorasick  # optional: pyahocorasick, faster multi-name matching
+except ImportError:
+    ahocorasick = None
+
+
+_PROOF_START_RE = re.compile(rb'\bProof\b')
+_PROOF_END_RE = re.compile(rb'\b(?:Qed|Defined|Admitted)\b')
+_DEF_RE = re.compile(r'^\s*(?:Lemma|Theorem|Corollary|Proposition|Fact|Remark)\s+(\w+)\b')
+_DEF_BYTES_RE = re.compile(rb'^[^\S\n]*(?:Lemma|Theorem|Corollary|Proposition|Fact|Remark)\b', re.MULTILINE)
+_IDENT_RE = re.compile(r'\w+')
+_IDENT_BYTES_RE = re.compile(rb'\w+')
+
+_DEF_KEYWORDS = (b'Lemma', b'Theorem', b'Corollary', b'Proposition', b'Fact', b'Remark')
+
+# Files with at most this many lemmas of interest locate them by direct
+# substring search instead of indexing every declaration in the file
+_DIRECT_LOOKUP_MAX = 3
+
+_HTML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
 
 @dataclass
 class LemmaInfo:
@@ -32,75 +56,310 @@ class LemmaInfo:
 
 def load_stats_csv(csv_path: Path) -> List[LemmaInfo]:
     """Load lemma information from a CSV stats file."""
-    lemmas = []
     with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            lemmas.append(LemmaInfo(
-                file_name=row['File'],
-                section=row['Section'],
-                name=row['Name'],
-                proof_lines=int(row['ProofLines']),
-                signature=row['Signature'],
-                meaning=row['Meaning']
-            ))
-    return lemmas
-
-
-def extract_proof_body(lines: List[str], start_idx: int) -> str:
-    """Extract the proof body from a lemma starting at start_idx."""
-    idx = start_idx
-    proof_started = False
-    proof_lines = []
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return []
+        # Resolve column positions once instead of building a dict per row
+        col = {name: i for i, name in enumerate(header)}
+        fi, si, ni, pi, gi, mi = (col[k] for k in
+                                  ('File', 'Section', 'Name', 'ProofLines', 'Signature', 'Meaning'))
+        return [
+            LemmaInfo(
+                # Interned: these are hashed and compared in every set/dict lookup
+                file_name=sys.intern(row[fi]),
+                section=sys.intern(row[si]),
+                name=sys.intern(row[ni]),
+                proof_lines=int(row[pi]),
+                signature=row[gi],
+                meaning=row[mi]
+            )
+            for row in reader if row
+        ]
+
+
+def strip_comments(data: bytes) -> bytes:
+    """Remove (possibly nested) (* ... *) comments, keeping their newlines.
     
-    while idx < len(lines):
-        line = lines[idx].strip()
-        line_no_comment = re.sub(r'\(\*.*?\*\)', '', line)
-        
-        if re.search(r'\bProof\b', line_no_comment):
-            proof_started = True
-            proof_lines.append(line)
-            idx += 1
+    Line numbers of the result match the input. An unterminated comment is
+    left in place.
+    """
+    out = []
+    i = 0
+    n = len(data)
+    while i < n:
+        j = data.find(b'(*', i)
+        if j < 0:
+            out.append(data[i:])
             break
-        
-        if re.search(r'\b(Qed|Defined|Admitted)\b', line_no_comment):
-            return line
-        
-        idx += 1
-        if idx - start_idx > 30:
-            return ''
+        out.append(data[i:j])
+        depth = 1
+        k = j + 2
+        while depth:
+            close = data.find(b'*)', k)
+            if close < 0:
+                break
+            opening = data.find(b'(*', k, close)
+            if opening >= 0:
+                depth += 1
+                k = opening + 2
+            else:
+                depth -= 1
+                k = close + 2
+        if depth:
+            out.append(data[j:])
+            break
+        out.append(b'\n' * data[j:k].count(b'\n'))
+        i = k
+    return b''.join(out)
+
+
+def line_offsets(data: bytes) -> List[int]:
+    """Compute the byte offset at which each line of the source starts."""
+    offsets = [0]
+    i = 0
+    while (j := data.find(b'\n', i)) != -1:
+        offsets.append(j + 1)
+        i = j + 1
+    return offsets
+
+
+def line_bytes(data: bytes, offsets: List[int], k: int) -> bytes:
+    """Return line k of the source, without its newline."""
+    end = offsets[k + 1] - 1 if k + 1 < len(offsets) else len(data)
+    return data[offsets[k]:end]
+
+
+def read_line(data: bytes, offsets: List[int], k: int) -> str:
+    """Decode line k of the source, without its line terminator."""
+    line = line_bytes(data, offsets, k).decode('utf-8', 'replace')
+    return line[:-1] if line.endswith('\r') else line
+
+
+def index_definitions(data: bytes, offsets: List[int]) -> Dict[str, int]:
+    """Map each declared lemma name to the first line it is declared on."""
+    positions: Dict[str, int] = {}
+    # Only decode the lines that the bytes prefilter flags as declarations
+    for m in _DEF_BYTES_RE.finditer(data):
+        idx = bisect_right(offsets, m.start()) - 1
+        def_match = _DEF_RE.match(read_line(data, offsets, idx))
+        if def_match:
+            positions.setdefault(def_match.group(1), idx)
+    return positions
+
+
+def find_definition(data: bytes, offsets: List[int], name: str) -> Optional[int]:
+    """Locate the line declaring name by searching for 'Keyword name' directly."""
+    name_bytes = name.encode('utf-8')
+    best = None
+    for kw in _DEF_KEYWORDS:
+        needle = kw + b' ' + name_bytes
+        pos = data.find(needle)
+        while pos != -1:
+            idx = bisect_right(offsets, pos) - 1
+            if best is not None and idx >= best:
+                break
+            def_match = _DEF_RE.match(read_line(data, offsets, idx))
+            if def_match and def_match.group(1) == name:
+                best = idx
+                break
+            pos = data.find(needle, pos + 1)
+    return best
+
+
+def extract_proof_body(data: bytes, offsets: List[int], start_idx: int) -> bytes:
+    """Extract the proof body from a lemma starting at line start_idx of comment-free source."""
+    num_lines = len(offsets)
     
-    if not proof_started:
-        return ''
+    def line_end(k: int) -> int:
+        return offsets[k + 1] - 1 if k + 1 < num_lines else len(data)
     
-    while idx < len(lines):
-        line = lines[idx]
-        proof_lines.append(line)
-        
-        line_no_comment = re.sub(r'\(\*.*?\*\)', '', line)
-        if re.search(r'\b(Qed|Defined|Admitted)\b', line_no_comment):
-            break
+    def line_of(pos: int) -> int:
+        return bisect_right(offsets, pos) - 1
+    
+    # Look for Proof (or a terminator without one) within 30 lines of the statement
+    begin = offsets[start_idx]
+    window_end = line_end(min(start_idx + 30, num_lines - 1))
+    m_proof = _PROOF_START_RE.search(data, begin, window_end)
+    m_end = _PROOF_END_RE.search(data, begin, window_end)
+    
+    if m_end and (not m_proof or line_of(m_end.start()) < line_of(m_proof.start())):
+        return line_bytes(data, offsets, line_of(m_end.start())).strip()
+    if not m_proof:
+        return b''
+    
+    # The proof runs to the line holding the next terminator, at most 500 lines on
+    proof_idx = line_of(m_proof.start())
+    limit = line_end(min(proof_idx + 500, num_lines - 1))
+    m_end = _PROOF_END_RE.search(data, m_proof.end(), limit)
+    end = line_end(line_of(m_end.start())) if m_end else limit
+    return data[offsets[proof_idx]:end]
+
+
+def compile_names_regex(names: Set[str]) -> re.Pattern:
+    """Compile a single alternation regex matching any of the given names as a whole word."""
+    sorted_names = sorted(names, key=len, reverse=True)
+    return re.compile(r'\b(?:' + '|'.join(re.escape(n) for n in sorted_names) + r')\b')
+
+
+@dataclass
+class NameMatcher:
+    """Finds whole-word occurrences of a fixed set of lemma names."""
+    identifiers: Set[str] = field(default_factory=set)
+    identifier_bytes: Dict[bytes, str] = field(default_factory=dict)
+    rank: Dict[str, int] = field(default_factory=dict)  # position in sorted order
+    min_len: int = 0  # encoded length of the shortest name
+    required: bytes = b''  # bytes that occur in every name
+    master_re: Optional[re.Pattern] = None
+    automaton: Any = None  # ahocorasick.Automaton when available
+    
+    @classmethod
+    def build(cls, names: Set[str]) -> 'NameMatcher':
+        """Split names into plain identifiers and others needing a multi-pattern matcher.
         
-        idx += 1
-        if len(proof_lines) > 500:
-            break
+        Plain identifiers are found by tokenizing the proof, which runs entirely
+        in C. Any remaining names use an Aho-Corasick automaton if pyahocorasick
+        is installed, else a regex.
+        """
+        identifiers = {n for n in names if _IDENT_RE.fullmatch(n)}
+        others = names - identifiers
+        matcher = cls(
+            identifiers=identifiers,
+            identifier_bytes={n.encode('utf-8'): n for n in identifiers},
+            rank={n: i for i, n in enumerate(sorted(names))},
+        )
+        if names:
+            encoded = [n.encode('utf-8') for n in names]
+            matcher.min_len = min(len(b) for b in encoded)
+            matcher.required = bytes(sorted(set.intersection(*(set(b) for b in encoded))))
+        if others and ahocorasick is not None:
+            matcher.automaton = ahocorasick.Automaton()
+            for n in others:
+                matcher.automaton.add_word(n, n)
+            matcher.automaton.make_automaton()
+        elif others:
+            matcher.master_re = compile_names_regex(others)
+        return matcher
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == '_'
+
+
+def _at_word_boundary(text: str, pos: int) -> bool:
+    """Equivalent of regex \\b at position pos of text."""
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < len(text) and _is_word_char(text[pos])
+    return before != after
+
+
+def find_used_lemmas(proof_body: bytes, matcher: NameMatcher, own_name: str) -> List[str]:
+    """Find which lemmas known to the matcher are referenced in a comment-free proof body."""
+    # Trivial proofs (e.g. 'Proof. done. Qed.') are shorter than any name or
+    # lack a byte that every name contains, so they cannot reference one
+    if len(proof_body) < matcher.min_len or any(c not in proof_body for c in matcher.required):
+        return []
+    
+    # A whole-word match of an identifier is exactly a \w+ token equal to it.
+    # On ASCII input bytes \w agrees with str \w, so skip decoding entirely.
+    text = None
+    if proof_body.isascii():
+        tokens = _IDENT_BYTES_RE.findall(proof_body)
+        hits = {matcher.identifier_bytes[t] for t in matcher.identifier_bytes.keys() & tokens}
+    else:
+        text = proof_body.decode('utf-8', 'replace')
+        hits = matcher.identifiers.intersection(_IDENT_RE.findall(text))
+    
+    if matcher.automaton is not None or matcher.master_re is not None:
+        if text is None:
+            text = proof_body.decode('utf-8', 'replace')
+        if matcher.automaton is not None:
+            for end_idx, name in matcher.automaton.iter(text):
+                start = end_idx - len(name) + 1
+                if _at_word_boundary(text, start) and _at_word_boundary(text, end_idx + 1):
+                    hits.add(name)
+        else:
+            hits.update(matcher.master_re.findall(text))
+    hits.discard(own_name)
+    return sorted(hits, key=matcher.rank.__getitem__)
+
+
+# Per-worker matcher, built once by _init_worker rather than pickled per task
+_matcher: Optional[NameMatcher] = None
+
+
+def _init_worker(names: Set[str]) -> None:
+    global _matcher
+    _matcher = NameMatcher.build(names)
+
+
+def index_coq_files(coq_dirs: List[Path]) -> Dict[str, Path]:
+    """Map each .v file's path relative to its Coq directory to its location.
     
-    return '\n'.join(proof_lines)
+    Directories are walked once, in order, so the first directory holding
+    a given relative path wins.
+    """
+    file_index: Dict[str, Path] = {}
+    for coq_dir in coq_dirs:
+        for dirpath, _, filenames in os.walk(coq_dir):
+            for fname in filenames:
+                if fname.endswith('.v'):
+                    full = os.path.join(dirpath, fname)
+                    file_index.setdefault(os.path.relpath(full, coq_dir), Path(full))
+    return file_index
 
 
-def find_used_lemmas(proof_body: str, all_lemma_names: Set[str], own_name: str) -> List[str]:
-    """Find which lemmas from the set are referenced in the proof body."""
-    used = []
-    proof_clean = re.sub(r'\(\*.*?\*\)', '', proof_body, flags=re.DOTALL)
+def _process_file(
+    lemmas: List[LemmaInfo],
+    filepath: Path,
+    matcher: NameMatcher
+) -> Dict[str, List[str]]:
+    """Analyze dependencies for the lemmas of a single file."""
+    dependencies = {}
+    
+    try:
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return {l.name: [] for l in lemmas}
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception as e:
+        print(f"Warning: Could not read {filepath}: {e}", file=sys.stderr)
+        return {l.name: [] for l in lemmas}
+    
+    # Strip comments once per file rather than once per proof; newlines are
+    # kept so line numbers still refer to the original source
+    with mm:
+        data = strip_comments(mm)
+    offsets = line_offsets(data)
     
-    for name in all_lemma_names:
-        if name == own_name:
-            continue
-        pattern = rf'\b{re.escape(name)}\b'
-        if re.search(pattern, proof_clean):
-            used.append(name)
+    direct = len(lemmas) <= _DIRECT_LOOKUP_MAX
+    positions: Optional[Dict[str, int]] = None
+    
+    for lemma in lemmas:
+        proof_body = None
+        idx = find_definition(data, offsets, lemma.name) if direct else None
+        if idx is None:
+            # Fall back to the full index, e.g. for 'Lemma\tname'
+            if positions is None:
+                positions = index_definitions(data, offsets)
+            idx = positions.get(lemma.name)
+        if idx is not None:
+            proof_body = extract_proof_body(data, offsets, idx)
+        
+        if proof_body:
+            used = find_used_lemmas(proof_body, matcher, lemma.name)
+            dependencies[lemma.name] = used
+        else:
+            dependencies[lemma.name] = []
     
-    return sorted(used)
+    return dependencies
+
+
+def _process_file_in_worker(lemmas: List[LemmaInfo], filepath: Path) -> Dict[str, List[str]]:
+    """Pool task: _process_file with the matcher built by _init_worker."""
+    assert _matcher is not None, "worker was not started with _init_worker"
+    return _process_file(lemmas, filepath, _matcher)
 
 
 def analyze_dependencies(stats: List[LemmaInfo], coq_dirs: List[Path]) -> Dict[str, List[str]]:
@@ -114,73 +373,59 @@ def analyze_dependencies(stats: List[LemmaInfo], coq_dirs: List[Path]) -> Dict[s
             files_to_lemmas[l.file_name] = []
         files_to_lemmas[l.file_name].append(l)
     
+    file_index = index_coq_files(coq_dirs)
+    work = []
     for file_name, lemmas in files_to_lemmas.items():
-        filepath = None
-        for coq_dir in coq_dirs:
-            candidate = coq_dir / file_name
-            if candidate.exists():
-                filepath = candidate
-                break
-        
-        if not filepath:
-            print(f"Warning: Could not find file {file_name}", file=sys.stderr)
-            for l in lemmas:
-                dependencies[l.name] = []
-            continue
-        
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                lines = f.read().split('\n')
-        except Exception as e:
-            print(f"Warning: Could not read {filepath}: {e}", file=sys.stderr)
-            for l in lemmas:
-                dependencies[l.name] = []
-            continue
-        
-        for lemma in lemmas:
-            proof_body = None
-            lemma_pattern = re.compile(
-                rf'^\s*(Lemma|Theorem|Corollary|Proposition|Fact|Remark)\s+{re.escape(lemma.name)}\b'
-            )
-            
-            for idx, line in enumerate(lines):
-                if lemma_pattern.match(line):
-                    proof_body = extract_proof_body(lines, idx)
+        filepath = file_index.get(os.path.normpath(file_name))
+        if filepath is None:
+            # Paths the walk cannot see (absolute, via symlinked dirs, ...)
+            for coq_dir in coq_dirs:
+                candidate = coq_dir / file_name
+                if candidate.exists():
+                    filepath = candidate
                     break
-            
-            if proof_body:
-                used = find_used_lemmas(proof_body, all_names, lemma.name)
-                dependencies[lemma.name] = used
+        if filepath is None:
+            print(f"Warning: Could not find file {file_name}", file=sys.stderr)
+        work.append((lemmas, filepath))
+    
+    # Files are independent, so analyze them in parallel; each worker
+    # builds its own name matcher once at startup. Results are merged in
+    # file order, as a sequential loop would, so that when a name occurs in
+    # several files the last file still wins.
+    found = [(lemmas, filepath) for lemmas, filepath in work if filepath is not None]
+    with ProcessPoolExecutor(initializer=_init_worker, initargs=(all_names,)) as ex:
+        results = ex.map(_process_file_in_worker,
+                         [lemmas for lemmas, _ in found],
+                         [filepath for _, filepath in found])
+        for lemmas, filepath in work:
+            if filepath is None:
+                for l in lemmas:
+                    dependencies[l.name] = []
             else:
-                dependencies[lemma.name] = []
+                dependencies.update(next(results))
     
     return dependencies
 
 
 def escape_html(text: str) -> str:
-    return (text.replace('&', '&amp;').replace('<', '&lt;')
-            .replace('>', '&gt;').replace('"', '&quot;'))
+    return text.translate(_HTML_ESCAPE)
 
 
-def format_csv(stats: List[LemmaInfo], deps: Dict[str, List[str]]) -> str:
-    import io
-    output = io.StringIO()
-    writer = csv.writer(output)
+def format_csv(stats: List[LemmaInfo], deps: Dict[str, List[str]], fp: TextIO) -> None:
+    writer = csv.writer(fp)
     writer.writerow(['Lemma', 'File', 'Section', 'Dependencies', 'Dep_Count'])
     for l in stats:
         dep_list = deps.get(l.name, [])
         writer.writerow([l.name, l.file_name, l.section, ', '.join(dep_list), len(dep_list)])
-    return output.getvalue()
 
 
-def format_markdown(stats: List[LemmaInfo], deps: Dict[str, List[str]]) -> str:
-    lines = ["| Lemma | File | Section | Dependencies |",
-             "|-------|------|---------|--------------|"]
+def format_markdown(stats: List[LemmaInfo], deps: Dict[str, List[str]]) -> Iterator[str]:
+    yield "| Lemma | File | Section | Dependencies |"
+    yield "|-------|------|---------|--------------|"
     for l in stats:
         dep_list = deps.get(l.name, [])
         dep_str = ', '.join(f'`{d}`' for d in dep_list) if dep_list else '—'
-        lines.append(f"| `{l.name}` | {l.file_name} | {l.section} | {dep_str} |")
-    return '\n'.join(lines)
+        yield f"| `{l.name}` | {l.file_name} | {l.section} | {dep_str} |"
 
 
 def format_html(stats: List[LemmaInfo], deps: Dict[str, List[str]], title: str) -> str:
@@ -193,20 +438,27 @@ def format_html(stats: List[LemmaInfo], deps: Dict[str, List[str]], title: str)
     total_deps = sum(len(deps.get(l.name, [])) for l in stats)
     max_deps = max((len(deps.get(l.name, [])) for l in stats), default=0)
     
-    rows_html = ""
+    # Escape each distinct file, section and lemma name once, not once per row
+    files_esc = {fn: escape_html(fn) for fn in files}
+    sections_esc = {sec: escape_html(sec) for sec in {l.section for l in stats}}
+    names_esc = {l.name: escape_html(l.name) for l in stats}
+    
+    rows_parts: List[str] = []
     for l in stats:
         dep_list = deps.get(l.name, [])
         if dep_list:
-            deps_html = ' '.join(f'<span class="tag">{escape_html(d)}</span>' for d in dep_list)
+            deps_html = ' '.join(f'<span class="tag">{names_esc[d]}</span>' for d in dep_list)
         else:
             deps_html = '<span class="none">—</span>'
-        rows_html += f'''<tr data-lemma="{escape_html(l.name)}">
-            <td class="name">{escape_html(l.name)}</td>
-            <td class="file">{escape_html(l.file_name)}</td>
-            <td>{escape_html(l.section)}</td>
+        name_esc = names_esc[l.name]
+        rows_parts.append(f'''<tr data-lemma="{name_esc}">
+            <td class="name">{name_esc}</td>
+            <td class="file">{files_esc[l.file_name]}</td>
+            <td>{sections_esc[l.section]}</td>
             <td class="count">{len(dep_list)}</td>
             <td class="deps">{deps_html}</td>
-        </tr>\n'''
+        </tr>\n''')
+    rows_html = ''.join(rows_parts)
     
     return f'''<!DOCTYPE html>
 <html lang="en">
@@ -302,14 +554,14 @@ def main():
     total_deps = sum(len(d) for d in deps.values())
     print(f"Found {total_deps} internal dependencies", file=sys.stderr)
     
+    # Stream line-oriented formats straight to stdout
     if args.format == 'csv':
-        output = format_csv(stats, deps)
+        format_csv(stats, deps, sys.stdout)
     elif args.format == 'html':
-        output = format_html(stats, deps, args.title)
+        print(format_html(stats, deps, args.title))
     else:
-        output = format_markdown(stats, deps)
-    
-    print(output)
+        for line in format_markdown(stats, deps):
+            print(line)
 
 
 if __name__ == '__main__':
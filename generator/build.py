@@ -12,16 +12,24 @@ Builds a static HTML site from Coq source files with:
 import os
 import re
 import sys
+import gzip
+import pickle
 import shutil
+import hashlib
 import subprocess
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
 from datetime import datetime
 from dataclasses import dataclass, field
-from typing import List, Dict, Set, Optional, Any
+from functools import lru_cache
+from typing import List, Dict, Set, Optional, Any, Tuple, Iterable
 from tempfile import TemporaryDirectory
 
 try:
     from jinja2 import Environment, FileSystemLoader
+    from markupsafe import Markup, escape
     import markdown
     import yaml
 except ImportError:
@@ -29,10 +37,48 @@ except ImportError:
     print("Run: pip install jinja2 markdown pyyaml")
     sys.exit(1)
 
+# Line-level text helpers; `make compile` builds them as a C extension,
+# which Python then imports in place of coq_text.py
+from coq_text import (
+    SourceText,
+    count_lines,
+    line_starts_of,
+    extract_preceding_comment,
+    extract_signature,
+    count_proof_lines,
+    extract_proof_body,
+)
+
+try:
+    import ahocorasick  # optional: pyahocorasick, single-pass dependency scan
+except ImportError:
+    ahocorasick = None
+
+try:
+    import brotli  # optional: .br copies of pages with --compress
+except ImportError:
+    brotli = None
+
 
 # Default configuration
 DEFAULT_OUTPUT_DIR = "../rocq-stats"
 PROJECTS_DIR = "../projects"
+CACHE_DIR = ".cache"  # Under the generator directory, outside the published site
+CACHE_VERSION = 1  # Bump when LemmaInfo or the parsing results change
+
+# Precompiled patterns used by the parser and the dependency scan
+_COMMENT_RE = re.compile(r'\(\*.*?\*\)', re.DOTALL)
+# Section starts, section ends and declarations in one pass over the file
+# text; [^\S\n] is \s without newline, so every match stays on its line
+_COQ_DECL_RE = re.compile(
+    r'^[^\S\n]*(?:'
+    r'Section[^\S\n]+(?P<section>\w+)[^\S\n]*\.'
+    r'|End[^\S\n]+(?P<end>\w+)[^\S\n]*\.'
+    r'|(?P<kind>Lemma|Theorem|Corollary|Proposition|Fact|Remark)[^\S\n]+(?P<name>\w+))',
+    re.MULTILINE
+)
+_IDENT_RE = re.compile(r'\w+')
+_DECL_KEYWORDS = ('Lemma', 'Theorem', 'Corollary', 'Proposition', 'Fact', 'Remark')
 
 
 @dataclass
@@ -63,6 +109,18 @@ class ProjectConfig:
             index_file=data.get('index', ''),
             commit=data['source'].get('commit'),
         )
+    
+    def sparse_paths(self) -> Optional[List[str]]:
+        """Repository directories the build reads, or None if it needs the whole tree."""
+        paths = [os.path.normpath(d) for d in self.directories]
+        if self.index_file:
+            # Files at the repository root are always checked out in cone mode
+            index_dir = os.path.dirname(os.path.normpath(self.index_file))
+            if index_dir:
+                paths.append(index_dir)
+        if not paths or any(p == '.' or p.startswith('..') or os.path.isabs(p) for p in paths):
+            return None
+        return paths
 
 
 @dataclass
@@ -76,174 +134,12 @@ class LemmaInfo:
     declaration_type: str = "Lemma"
     is_helper: bool = False
     is_main: bool = False
-    uses: List[str] = field(default_factory=list)
-    used_by: List[str] = field(default_factory=list)
-
-
-def extract_preceding_comment(lines: List[str], lemma_line_idx: int) -> str:
-    """Extract comment block immediately preceding a lemma."""
-    idx = lemma_line_idx - 1
-    
-    while idx >= 0 and lines[idx].strip() == '':
-        idx -= 1
-    
-    if idx >= 0:
-        line = lines[idx].strip()
-        if line.startswith('(*') and line.endswith('*)'):
-            return line[2:-2].strip()
-    
-    in_comment = False
-    comment_lines = []
-    
-    while idx >= 0:
-        line = lines[idx].strip()
-        
-        if line.endswith('*)') and not in_comment:
-            in_comment = True
-            content = line[:-2].strip() if line != '*)' else ''
-            if content:
-                comment_lines.insert(0, content)
-        elif line.startswith('(*') and in_comment:
-            content = line[2:].strip() if line != '(*' else ''
-            if content:
-                comment_lines.insert(0, content)
-            break
-        elif in_comment:
-            cleaned = line.lstrip('*').strip()
-            if cleaned:
-                comment_lines.insert(0, cleaned)
-        elif line == '':
-            if not in_comment:
-                break
-        else:
-            break
-        idx -= 1
-    
-    if comment_lines:
-        result = ' '.join(comment_lines)
-        result = re.sub(r'\s+', ' ', result)
-        return result
-    
-    return ''
-
-
-def extract_signature(lines: List[str], start_idx: int) -> str:
-    """Extract the full signature of a lemma/theorem."""
-    signature_lines = []
-    idx = start_idx
-    paren_depth = 0
-    found_colon = False
-    
-    while idx < len(lines):
-        line = lines[idx].strip()
-        line = re.sub(r'\(\*.*?\*\)', '', line)
-        signature_lines.append(line)
-        
-        paren_depth += line.count('(') - line.count(')')
-        paren_depth += line.count('[') - line.count(']')
-        paren_depth += line.count('{') - line.count('}')
-        
-        if ':' in line:
-            found_colon = True
-        
-        if line.rstrip().endswith('.') and paren_depth <= 0 and found_colon:
-            break
-        
-        if 'Proof' in line or 'Proof.' in line:
-            signature_lines[-1] = re.sub(r'\bProof\.?', '', signature_lines[-1]).strip()
-            break
-        
-        idx += 1
-        if idx - start_idx > 20:
-            break
-    
-    sig = ' '.join(signature_lines)
-    sig = re.sub(r'\s+', ' ', sig).strip()
-    sig = re.sub(r'\s*Proof\.?\s*$', '', sig)
-    return sig
-
-
-def count_proof_lines(lines: List[str], start_idx: int) -> int:
-    """Count the number of lines in a proof."""
-    idx = start_idx
-    proof_started = False
-    proof_start_line = start_idx
-    
-    while idx < len(lines):
-        line = lines[idx].strip()
-        line_no_comment = re.sub(r'\(\*.*?\*\)', '', line)
-        
-        if re.search(r'\bProof\b', line_no_comment):
-            proof_started = True
-            proof_start_line = idx
-            break
-        
-        if re.search(r'\b(Qed|Defined|Admitted)\b', line_no_comment):
-            return 1
-        
-        idx += 1
-        if idx - start_idx > 30:
-            return 0
-    
-    if not proof_started:
-        return 0
-    
-    proof_lines = 0
-    idx = proof_start_line
-    
-    while idx < len(lines):
-        line = lines[idx].strip()
-        line_no_comment = re.sub(r'\(\*.*?\*\)', '', line)
-        
-        if line and not line.startswith('(*'):
-            proof_lines += 1
-        
-        if re.search(r'\b(Qed|Defined|Admitted)\b', line_no_comment):
-            break
-        
-        idx += 1
-        if idx - proof_start_line > 500:
-            break
-    
-    return max(1, proof_lines)
-
-
-def extract_proof_body(lines: List[str], start_idx: int) -> str:
-    """Extract the proof body from a lemma."""
-    idx = start_idx
-    proof_started = False
-    proof_lines = []
-    
-    while idx < len(lines):
-        line = lines[idx].strip()
-        line_no_comment = re.sub(r'\(\*.*?\*\)', '', line)
-        
-        if re.search(r'\bProof\b', line_no_comment):
-            proof_started = True
-            proof_lines.append(lines[idx])
-            idx += 1
-            break
-        
-        if re.search(r'\b(Qed|Defined|Admitted)\b', line_no_comment):
-            return lines[idx]
-        
-        idx += 1
-        if idx - start_idx > 30:
-            return ''
-    
-    if not proof_started:
-        return ''
-    
-    while idx < len(lines):
-        proof_lines.append(lines[idx])
-        line_no_comment = re.sub(r'\(\*.*?\*\)', '', lines[idx])
-        if re.search(r'\b(Qed|Defined|Admitted)\b', line_no_comment):
-            break
-        idx += 1
-        if len(proof_lines) > 500:
-            break
-    
-    return '\n'.join(proof_lines)
+    start_idx: int = 0  # Line index of the declaration within its file
+    uses: Set[str] = field(default_factory=set)  # Sorted when rendered
+    used_by: Set[str] = field(default_factory=set)
+    # HTML-escaped signature and meaning, computed once before rendering
+    signature_html: str = ''
+    meaning_html: str = ''
 
 
 def classify_lemma(lemma: LemmaInfo) -> None:
@@ -261,14 +157,23 @@ def classify_lemma(lemma: LemmaInfo) -> None:
         lemma.is_helper = True
 
 
-def parse_coq_file(filepath: Path, base_dir: Path) -> List[LemmaInfo]:
-    """Parse a Coq file and extract lemma information."""
+def parse_coq_file(
+    filepath: Path,
+    base_dir: Path,
+    file_texts: Optional[Dict[str, SourceText]] = None,
+    line_counts: Optional[Dict[str, int]] = None
+) -> List[LemmaInfo]:
+    """Parse a Coq file and extract lemma information.
+    
+    If file_texts is given and the file declares anything, its content and
+    line starts are stored in it under the lemmas' file_name so later passes
+    can reuse them without re-reading. If line_counts is given, the file's
+    number of lines is stored in it under the same key.
+    """
     lemmas = []
     
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-            lines = content.split('\n')
+        content = filepath.read_text(encoding='utf-8')
     except Exception as e:
         print(f"Warning: Could not read {filepath}: {e}", file=sys.stderr)
         return []
@@ -278,40 +183,44 @@ def parse_coq_file(filepath: Path, base_dir: Path) -> List[LemmaInfo]:
     except ValueError:
         relative_path = filepath
     
-    current_section = "Top-level"
-    section_stack = ["Top-level"]
+    if line_counts is not None:
+        line_counts[str(relative_path)] = count_lines(content)
     
-    lemma_pattern = re.compile(
-        r'^\s*(Lemma|Theorem|Corollary|Proposition|Fact|Remark)\s+(\w+)',
-        re.MULTILINE
-    )
+    # Definition-only files are common; a substring test rules them out
+    # without building the line table or running the declaration scan
+    if not any(keyword in content for keyword in _DECL_KEYWORDS):
+        return []
+    
+    # Lines are only sliced out of content where a helper needs one
+    line_starts = line_starts_of(content)
+    
+    if file_texts is not None:
+        file_texts[str(relative_path)] = (content, line_starts)
     
-    section_start = re.compile(r'^\s*Section\s+(\w+)\s*\.', re.MULTILINE)
-    section_end = re.compile(r'^\s*End\s+(\w+)\s*\.', re.MULTILINE)
+    current_section = "Top-level"
+    section_stack = ["Top-level"]
     
-    for idx, line in enumerate(lines):
-        section_match = section_start.match(line)
-        if section_match:
-            section_name = section_match.group(1)
+    for match in _COQ_DECL_RE.finditer(content):
+        section_name = match.group('section')
+        if section_name:
             section_stack.append(section_name)
             current_section = section_name
             continue
         
-        end_match = section_end.match(line)
-        if end_match:
+        if match.group('end'):
             if len(section_stack) > 1:
                 section_stack.pop()
                 current_section = section_stack[-1]
             continue
         
-        lemma_match = lemma_pattern.match(line)
-        if lemma_match:
-            decl_type = lemma_match.group(1)
-            lemma_name = lemma_match.group(2)
+        if match.group('kind'):
+            idx = bisect_right(line_starts, match.start()) - 1
+            decl_type = match.group('kind')
+            lemma_name = match.group('name')
             
-            signature = extract_signature(lines, idx)
-            meaning = extract_preceding_comment(lines, idx)
-            proof_lines = count_proof_lines(lines, idx)
+            signature = extract_signature(content, line_starts, idx)
+            meaning = extract_preceding_comment(content, line_starts, idx)
+            proof_lines = count_proof_lines(content, line_starts, idx)
             
             lemma = LemmaInfo(
                 file_name=str(relative_path),
@@ -320,7 +229,8 @@ def parse_coq_file(filepath: Path, base_dir: Path) -> List[LemmaInfo]:
                 signature=signature,
                 meaning=meaning,
                 proof_lines=proof_lines,
-                declaration_type=decl_type
+                declaration_type=decl_type,
+                start_idx=idx
             )
             classify_lemma(lemma)
             lemmas.append(lemma)
@@ -328,75 +238,140 @@ def parse_coq_file(filepath: Path, base_dir: Path) -> List[LemmaInfo]:
     return lemmas
 
 
-def analyze_dependencies(lemmas: List[LemmaInfo], coq_dirs: List[Path]) -> None:
-    """Analyze which lemmas use other lemmas."""
-    all_names = {l.name for l in lemmas}
+def _parse_one(
+    job: Tuple[Path, Path]
+) -> Tuple[List[LemmaInfo], Dict[str, SourceText], Dict[str, int]]:
+    """Process-pool wrapper around parse_coq_file, also returning the file's text and line count."""
+    filepath, base_dir = job
+    file_texts: Dict[str, SourceText] = {}
+    line_counts: Dict[str, int] = {}
+    lemmas = parse_coq_file(filepath, base_dir, file_texts, line_counts)
+    return lemmas, file_texts, line_counts
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == '_'
+
+
+def find_used_names(text: str, all_names: Set[str], automaton: Any = None) -> Set[str]:
+    """Find every name from all_names occurring as a whole word in text."""
+    if automaton is None:
+        # Lemma names are \w+ identifiers, so a whole-word match is exactly a token
+        return all_names.intersection(_IDENT_RE.findall(text))
+    
+    found = set()
+    for end_idx, name in automaton.iter(text):
+        start = end_idx - len(name) + 1
+        if start > 0 and _is_word_char(text[start - 1]):
+            continue
+        if end_idx + 1 < len(text) and _is_word_char(text[end_idx + 1]):
+            continue
+        found.add(name)
+    return found
+
+
+def analyze_dependencies(
+    lemmas: List[LemmaInfo],
+    file_texts: Dict[str, SourceText],
+    name_to_lemma: Dict[str, LemmaInfo]
+) -> None:
+    """Analyze which lemmas use other lemmas, using the text cached while parsing."""
+    all_names = set(name_to_lemma)
     
-    files_to_lemmas: Dict[str, List[LemmaInfo]] = {}
-    for l in lemmas:
-        if l.file_name not in files_to_lemmas:
-            files_to_lemmas[l.file_name] = []
-        files_to_lemmas[l.file_name].append(l)
+    # One automaton over all names replaces a regex search per name
+    automaton = None
+    if ahocorasick is not None and all_names:
+        automaton = ahocorasick.Automaton()
+        for name in all_names:
+            automaton.add_word(name, name)
+        automaton.make_automaton()
     
-    for file_name, file_lemmas in files_to_lemmas.items():
-        filepath = None
-        for coq_dir in coq_dirs:
-            candidate = coq_dir / file_name
-            if candidate.exists():
-                filepath = candidate
-                break
-        
-        if not filepath:
+    for lemma in lemmas:
+        text = file_texts.get(lemma.file_name)
+        if text is None:
             continue
         
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                lines = f.read().split('\n')
-        except Exception:
-            continue
+        proof_body = extract_proof_body(*text, lemma.start_idx)
+        proof_clean = _COMMENT_RE.sub('', proof_body)
         
-        for lemma in file_lemmas:
-            lemma_pattern = re.compile(
-                rf'^\s*(Lemma|Theorem|Corollary|Proposition|Fact|Remark)\s+{re.escape(lemma.name)}\b'
-            )
-            
-            for idx, line in enumerate(lines):
-                if lemma_pattern.match(line):
-                    proof_body = extract_proof_body(lines, idx)
-                    proof_clean = re.sub(r'\(\*.*?\*\)', '', proof_body, flags=re.DOTALL)
-                    
-                    for name in all_names:
-                        if name == lemma.name:
-                            continue
-                        if re.search(rf'\b{re.escape(name)}\b', proof_clean):
-                            lemma.uses.append(name)
-                    break
-    
-    name_to_lemma = {l.name: l for l in lemmas}
+        found = find_used_names(proof_clean, all_names, automaton)
+        found.discard(lemma.name)
+        lemma.uses = found
+    
     for lemma in lemmas:
         for used_name in lemma.uses:
             if used_name in name_to_lemma:
-                name_to_lemma[used_name].used_by.append(lemma.name)
+                name_to_lemma[used_name].used_by.add(lemma.name)
 
 
-def load_index_markdown(index_path: Path) -> str:
-    """Load and convert index markdown file to HTML."""
-    if not index_path.exists():
-        return "<p>Index documentation not found.</p>"
-    
-    with open(index_path, 'r', encoding='utf-8') as f:
-        md_content = f.read()
-    
-    html = markdown.markdown(
+@lru_cache(maxsize=64)
+def _render_md(path_str: str, mtime: float) -> str:
+    """Convert a markdown file to HTML; mtime is part of the key so edits invalidate it."""
+    md_content = Path(path_str).read_text(encoding='utf-8')
+    return markdown.markdown(
         md_content,
         extensions=['tables', 'fenced_code', 'toc']
     )
-    return html
 
 
-def clone_repo(repo_url: str, branch: str, dest_dir: Path, commit: Optional[str] = None) -> bool:
-    """Clone a git repository and optionally checkout a specific commit."""
+def load_index_markdown(index_path: Path) -> str:
+    """Load and convert index markdown file to HTML."""
+    if not index_path.exists():
+        return "<p>Index documentation not found.</p>"
+    
+    return _render_md(str(index_path), index_path.stat().st_mtime)
+
+
+def _sparse_clone(
+    repo_url: str,
+    branch: str,
+    dest_dir: Path,
+    commit: Optional[str],
+    paths: List[str]
+) -> bool:
+    """Blobless clone that only checks out the given directories."""
+    clone_cmd = ['git', 'clone', '--filter=blob:none', '--no-checkout', '--branch', branch]
+    if not commit:
+        clone_cmd += ['--depth', '1']
+    clone_cmd += [repo_url, str(dest_dir)]
+    
+    # Blobs are fetched lazily, only for the paths the checkout needs
+    steps = [
+        clone_cmd,
+        ['git', '-C', str(dest_dir), 'sparse-checkout', 'init', '--cone'],
+        ['git', '-C', str(dest_dir), 'sparse-checkout', 'set', *paths],
+        ['git', '-C', str(dest_dir), 'checkout', commit or branch],
+    ]
+    for cmd in steps:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return False
+    return True
+
+
+def clone_repo(
+    repo_url: str,
+    branch: str,
+    dest_dir: Path,
+    commit: Optional[str] = None,
+    paths: Optional[List[str]] = None
+) -> bool:
+    """Clone a git repository and optionally checkout a specific commit.
+    
+    If paths is given, first try a sparse partial clone of just those
+    directories, falling back to a regular clone if the remote or the
+    local git does not support it.
+    """
     try:
+        if paths:
+            if _sparse_clone(repo_url, branch, dest_dir, commit, paths):
+                if commit:
+                    print(f"  Checked out commit: {commit[:7]}")
+                return True
+            print("  Sparse clone failed, falling back to a full clone", file=sys.stderr)
+            shutil.rmtree(dest_dir, ignore_errors=True)
+            dest_dir.mkdir(parents=True, exist_ok=True)
+        
         if commit:
             # Need full clone to checkout specific commit
             cmd = ['git', 'clone', '--branch', branch, repo_url, str(dest_dir)]
@@ -424,53 +399,217 @@ def clone_repo(repo_url: str, branch: str, dest_dir: Path, commit: Optional[str]
         return False
 
 
-def build_project(
-    config: ProjectConfig,
-    source_root: Path,
-    output_dir: Path,
-    env: Environment,
-    base_context: Dict[str, Any]
-) -> Dict[str, Any]:
-    """Build a single project's documentation site."""
-    project_output = output_dir / config.name
-    project_output.mkdir(parents=True, exist_ok=True)
-    (project_output / 'lemmas').mkdir(exist_ok=True)
-    (project_output / 'static').mkdir(exist_ok=True)
-    
-    # Copy static files
+def copy_static_files(static_dst: Path) -> None:
+    """Populate static_dst with copies of the generator's static assets."""
     static_src = Path(__file__).parent / 'static'
-    static_dst = project_output / 'static'
     for f in static_src.glob('*'):
-        shutil.copy(f, static_dst / f.name)
+        dst = static_dst / f.name
+        # Replace rather than write through an existing file, which may be a
+        # hard link back to the source left by an older build
+        if dst.exists() or dst.is_symlink():
+            dst.unlink()
+        shutil.copyfile(f, dst)
+
+
+def collect_lemmas(
+    config: ProjectConfig,
+    source_root: Path
+) -> Tuple[List[LemmaInfo], int, Dict[str, LemmaInfo]]:
+    """Parse a project's Coq files and analyze the dependencies between lemmas.
     
-    # Parse Coq files
+    Returns the lemmas, the total number of source lines and the lemmas by name.
+    """
     print(f"  Parsing Coq files for {config.name}...")
     all_lemmas = []
-    coq_dirs = []
+    file_texts: Dict[str, SourceText] = {}
     total_lines = 0
     
+    jobs = []
     for dir_name in config.directories:
         coq_dir = source_root / dir_name
         if not coq_dir.exists():
             print(f"  Warning: Directory {coq_dir} not found", file=sys.stderr)
             continue
         
-        coq_dirs.append(coq_dir)
-        for vfile in sorted(coq_dir.rglob('*.v')):
-            # Count lines in each file
-            try:
-                with open(vfile, 'r', encoding='utf-8') as f:
-                    total_lines += sum(1 for _ in f)
-            except Exception:
-                pass
-            # Use source_root as base so file paths are relative to repo root
-            lemmas = parse_coq_file(vfile, source_root)
+        # Use source_root as base so file paths are relative to repo root
+        jobs.extend((vfile, source_root) for vfile in sorted(coq_dir.rglob('*.v')))
+    
+    # Files parse independently; map() keeps results in job order
+    with ProcessPoolExecutor() as ex:
+        for lemmas, texts, line_counts in ex.map(_parse_one, jobs, chunksize=8):
             all_lemmas.extend(lemmas)
+            file_texts.update(texts)
+            total_lines += sum(line_counts.values())
     
     print(f"  Found {len(all_lemmas)} lemmas ({total_lines} lines)")
     
     # Analyze dependencies
-    analyze_dependencies(all_lemmas, coq_dirs)
+    name_to_lemma = {l.name: l for l in all_lemmas}
+    analyze_dependencies(all_lemmas, file_texts, name_to_lemma)
+    
+    return all_lemmas, total_lines, name_to_lemma
+
+
+def _source_sha(source_root: Path) -> Optional[str]:
+    """Commit checked out in source_root, or None if it is not a git checkout."""
+    result = subprocess.run(
+        ['git', '-C', str(source_root), 'rev-parse', 'HEAD'],
+        capture_output=True, text=True
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def load_lemmas_cached(
+    config: ProjectConfig,
+    source_root: Path,
+    cache_dir: Path
+) -> Tuple[List[LemmaInfo], int, Dict[str, LemmaInfo]]:
+    """collect_lemmas, reusing the pickled result from a build of the same commit."""
+    sha = _source_sha(source_root)
+    if sha is None:
+        return collect_lemmas(config, source_root)
+    
+    key = hashlib.sha1(
+        f"{CACHE_VERSION}:{sha}:{sorted(config.directories)}".encode()
+    ).hexdigest()
+    cache_path = cache_dir / f"{config.name}-{key}.pkl"
+    
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'rb') as f:
+                result = pickle.load(f)
+            print(f"  Loaded {len(result[0])} lemmas from cache ({sha[:7]})")
+            return result
+        except Exception as e:
+            print(f"  Warning: Ignoring unreadable cache {cache_path}: {e}", file=sys.stderr)
+    
+    result = collect_lemmas(config, source_root)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(result, f, protocol=5)
+    except OSError as e:
+        print(f"  Warning: Could not write cache {cache_path}: {e}", file=sys.stderr)
+    return result
+
+
+def write_page(path: Path, chunks: Iterable[str], compress: bool = False) -> None:
+    """Write a rendered page from its chunks (e.g. a Jinja template stream).
+    
+    With compress, gzip and (if brotli is installed) brotli copies are written
+    alongside at maximum compression, for static servers that serve
+    precompressed files such as nginx with gzip_static.
+    """
+    if not compress:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(chunks)
+        return
+    
+    br = brotli.Compressor(quality=11) if brotli is not None else None
+    with ExitStack() as stack:
+        out = stack.enter_context(open(path, 'wb'))
+        # No file name and mtime=0 keep the .gz output reproducible
+        gz = stack.enter_context(gzip.GzipFile(
+            filename='', mode='wb', compresslevel=9, mtime=0,
+            fileobj=stack.enter_context(open(f'{path}.gz', 'wb'))
+        ))
+        br_out = stack.enter_context(open(f'{path}.br', 'wb')) if br else None
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            out.write(data)
+            gz.write(data)
+            if br_out:
+                br_out.write(br.process(data))
+        if br_out:
+            br_out.write(br.finish())
+
+
+def stats_row_html(lemma: LemmaInfo) -> str:
+    """Table row for a lemma on the stats page."""
+    if lemma.is_helper:
+        badge = '<span class="badge badge-helper">Helper</span>'
+    elif lemma.declaration_type == 'Theorem':
+        badge = '<span class="badge badge-theorem">Theorem</span>'
+    else:
+        badge = '<span class="badge badge-main">Main</span>'
+    name = escape(lemma.name)
+    search = escape(f"{lemma.name.lower()} {lemma.signature.lower()} {lemma.meaning.lower()}")
+    return (
+        f'<tr data-search="{search}">\n'
+        f'    <td>\n        {badge}\n'
+        f'        <a href="lemmas/{name}.html" class="lemma-name">{name}</a>\n    </td>\n'
+        f'    <td class="section-name">{escape(lemma.section)}</td>\n'
+        f'    <td class="proof-lines">{lemma.proof_lines}</td>\n'
+        f'    <td><code class="signature">{lemma.signature_html}</code></td>\n'
+        f'    <td class="meaning">{lemma.meaning_html}</td>\n'
+        f'</tr>'
+    )
+
+
+def dependency_row_html(lemma: LemmaInfo) -> str:
+    """Table row for a lemma on the dependencies page."""
+    if lemma.declaration_type == 'Theorem':
+        badge, classification = '<span class="badge badge-theorem">T</span>', 0
+    elif lemma.is_helper:
+        badge, classification = '<span class="badge badge-helper">H</span>', 2
+    else:
+        badge, classification = '<span class="badge badge-main">M</span>', 1
+    name = escape(lemma.name)
+    if lemma.uses:
+        tags = '\n'.join(
+            f'            <a href="lemmas/{dep}.html" class="dep-tag">{dep}</a>'
+            for dep in map(escape, sorted(lemma.uses))
+        )
+        uses_html = f'<div class="deps-list">\n{tags}\n        </div>'
+    else:
+        uses_html = '<span class="no-deps">No dependencies in stats</span>'
+    return (
+        f'<tr data-lemma="{name}" data-search="{escape(lemma.name.lower())}" '
+        f'data-deps="{len(lemma.uses)}" data-usedby="{len(lemma.used_by)}" '
+        f'data-classification="{classification}">\n'
+        f'    <td>\n        {badge}\n'
+        f'        <a href="lemmas/{name}.html" class="lemma-name">{name}</a>\n    </td>\n'
+        f'    <td class="file-name" style="font-size: 0.85rem;">{escape(lemma.file_name)}</td>\n'
+        f'    <td class="section-name">{escape(lemma.section)}</td>\n'
+        f'    <td class="proof-lines" style="text-align: center;">{len(lemma.uses)}</td>\n'
+        f'    <td class="proof-lines" style="text-align: center; color: var(--purple);">{len(lemma.used_by)}</td>\n'
+        f'    <td>\n        {uses_html}\n    </td>\n'
+        f'</tr>'
+    )
+
+
+def build_project(
+    config: ProjectConfig,
+    source_root: Path,
+    output_dir: Path,
+    env: Environment,
+    base_context: Dict[str, Any],
+    cache_dir: Optional[Path] = None,
+    compress: bool = False
+) -> Dict[str, Any]:
+    """Build a single project's documentation site.
+    
+    If cache_dir is given, parsed lemmas are cached there per source commit.
+    If compress is set, pages also get precompressed copies (see write_page).
+    """
+    project_output = output_dir / config.name
+    project_output.mkdir(parents=True, exist_ok=True)
+    (project_output / 'lemmas').mkdir(exist_ok=True)
+    (project_output / 'static').mkdir(exist_ok=True)
+    
+    # Copy static files
+    copy_static_files(project_output / 'static')
+    
+    # Parse Coq files and analyze dependencies
+    if cache_dir is not None:
+        all_lemmas, total_lines, name_to_lemma = load_lemmas_cached(config, source_root, cache_dir)
+    else:
+        all_lemmas, total_lines, name_to_lemma = collect_lemmas(config, source_root)
+    
+    # Every page showing a lemma reuses these instead of escaping again
+    for l in all_lemmas:
+        l.signature_html = escape(l.signature)
+        l.meaning_html = escape(l.meaning)
     
     # Calculate statistics
     total_lemmas = len(all_lemmas)
@@ -513,7 +652,7 @@ def build_project(
     # Build index page
     print(f"  Building index page...")
     index_template = env.get_template('index.html')
-    index_content = index_template.render(
+    write_page(project_output / 'index.html', index_template.stream(
         **project_context,
         active_tab='overview',
         is_subpage=False,
@@ -521,9 +660,7 @@ def build_project(
         main_count=len(main_lemmas),
         helper_count=len(helper_lemmas),
         theorem_count=len(theorems),
-    )
-    with open(project_output / 'index.html', 'w', encoding='utf-8') as f:
-        f.write(index_content)
+    ), compress)
     
     # Build stats page
     print(f"  Building stats page...")
@@ -536,8 +673,14 @@ def build_project(
         else:
             files_dict[l.file_name]['main'].append(l)
     
+    # Table rows are built in Python; a Jinja loop per row dominates on large projects
+    for file_data in files_dict.values():
+        file_data['main_rows'] = Markup('\n'.join(map(stats_row_html, file_data['main'])))
+        file_data['helper_rows'] = Markup('\n'.join(map(stats_row_html, file_data['helper'])))
+    
+    # The big pages are streamed to disk rather than built as one string
     stats_template = env.get_template('stats.html')
-    stats_content = stats_template.render(
+    write_page(project_output / 'stats.html', stats_template.stream(
         **project_context,
         active_tab='stats',
         is_subpage=False,
@@ -547,41 +690,50 @@ def build_project(
         files=files_dict,
         main_count=len(main_lemmas),
         helper_count=len(helper_lemmas),
-    )
-    with open(project_output / 'stats.html', 'w', encoding='utf-8') as f:
-        f.write(stats_content)
+    ), compress)
     
     # Build dependencies page
     print(f"  Building dependencies page...")
     deps_template = env.get_template('dependencies.html')
-    deps_content = deps_template.render(
+    write_page(project_output / 'dependencies.html', deps_template.stream(
         **project_context,
         active_tab='dependencies',
         is_subpage=False,
         lemmas=all_lemmas,
+        rows_html=Markup('\n'.join(map(dependency_row_html, all_lemmas))),
         total_deps=total_deps,
-    )
-    with open(project_output / 'dependencies.html', 'w', encoding='utf-8') as f:
-        f.write(deps_content)
+    ), compress)
     
     # Build individual lemma pages
     print(f"  Building lemma detail pages...")
     lemma_template = env.get_template('lemma.html')
-    name_to_lemma = {l.name: l for l in all_lemmas}
     all_lemma_names = [l.name for l in all_lemmas]
     
-    for lemma in all_lemmas:
-        lemma_content = lemma_template.render(
-            **project_context,
-            active_tab=None,
-            is_subpage=True,
+    lemmas_output = project_output / 'lemmas'
+    
+    # Shared by every lemma page; passed as is rather than unpacked per page
+    lemma_context = {
+        **project_context,
+        'active_tab': None,
+        'is_subpage': True,
+        'all_lemma_names': all_lemma_names,
+    }
+    
+    def render_lemma(lemma: LemmaInfo) -> None:
+        write_page(lemmas_output / f'{lemma.name}.html', lemma_template.stream(
+            lemma_context,
             lemma=lemma,
-            uses_lemmas=[name_to_lemma[n] for n in lemma.uses if n in name_to_lemma],
-            used_by_lemmas=[name_to_lemma[n] for n in lemma.used_by if n in name_to_lemma],
-            all_lemma_names=all_lemma_names,
-        )
-        with open(project_output / 'lemmas' / f'{lemma.name}.html', 'w', encoding='utf-8') as f:
-            f.write(lemma_content)
+            uses_lemmas=[name_to_lemma[n] for n in sorted(lemma.uses) if n in name_to_lemma],
+            used_by_lemmas=[name_to_lemma[n] for n in sorted(lemma.used_by) if n in name_to_lemma],
+        ), compress)
+    
+    # Pages are independent; a compiled Jinja template is safe to render concurrently.
+    # Iterating name_to_lemma keeps the last declaration of a duplicated name, as
+    # the sequential loop did, instead of racing two writes to one file.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        # Consume the iterator so worker exceptions propagate
+        for _ in ex.map(render_lemma, name_to_lemma.values()):
+            pass
     
     return {
         'name': config.name,
@@ -603,25 +755,23 @@ def build_project(
 def build_root_index(
     projects_info: List[Dict[str, Any]],
     output_dir: Path,
-    env: Environment
+    env: Environment,
+    generated_time: str,
+    compress: bool = False
 ) -> None:
     """Build the root index page listing all projects."""
     root_template = env.get_template('root_index.html')
-    root_content = root_template.render(
+    write_page(output_dir / 'index.html', root_template.stream(
         site_title='Rocq Stats',
         site_description='Lemma statistics and documentation for Rocq/Coq formalizations',
         projects=projects_info,
-        generated_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    )
-    with open(output_dir / 'index.html', 'w', encoding='utf-8') as f:
-        f.write(root_content)
+        generated_time=generated_time,
+    ), compress)
     
     # Copy static files to root
-    static_src = Path(__file__).parent / 'static'
     static_dst = output_dir / 'static'
     static_dst.mkdir(exist_ok=True)
-    for f in static_src.glob('*'):
-        shutil.copy(f, static_dst / f.name)
+    copy_static_files(static_dst)
 
 
 def main():
@@ -646,6 +796,16 @@ def main():
         default=None,
         help='Directory containing project YAML files (default: ../projects)'
     )
+    parser.add_argument(
+        '--compress',
+        action='store_true',
+        help='Also write precompressed .gz (and .br, if brotli is installed) copies of each page'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        help='Directory for cached parse results of cloned sources (default: generator/.cache)'
+    )
     args = parser.parse_args()
     
     generator_dir = Path(__file__).parent
@@ -662,6 +822,12 @@ def main():
     else:
         projects_dir = (generator_dir / PROJECTS_DIR).resolve()
     
+    # Determine cache directory; keep it out of the output, which is published
+    if args.cache_dir:
+        cache_dir = Path(args.cache_dir)
+    else:
+        cache_dir = (generator_dir / CACHE_DIR).resolve()
+    
     # Load project configurations
     project_configs = []
     if args.project:
@@ -687,12 +853,19 @@ def main():
     # Setup Jinja environment
     env = Environment(
         loader=FileSystemLoader(generator_dir / 'templates'),
-        autoescape=True
+        autoescape=True,
+        # Templates do not change during a build: skip the per-lookup
+        # freshness check and keep every compiled template cached
+        auto_reload=False,
+        cache_size=400,
     )
     
+    # Take the build time once so every page agrees on it
+    build_time = datetime.now()
+    
     # Use date only (no time) to make builds more deterministic for CI
     base_context = {
-        'generated_time': datetime.now().strftime('%Y-%m-%d'),
+        'generated_time': build_time.strftime('%Y-%m-%d'),
     }
     
     projects_info = []
@@ -707,7 +880,8 @@ def main():
                 print(f"Error: Local source not found: {source_root}", file=sys.stderr)
                 continue
             
-            info = build_project(config, source_root, output_dir, env, base_context)
+            info = build_project(config, source_root, output_dir, env, base_context,
+                                 compress=args.compress)
             projects_info.append(info)
         else:
             # Clone repo to temporary directory
@@ -715,15 +889,20 @@ def main():
                 source_root = Path(tmpdir)
                 commit_info = f" @ {config.commit[:7]}" if config.commit else ""
                 print(f"  Cloning {config.repo_url} ({config.branch}{commit_info})...")
-                if clone_repo(config.repo_url, config.branch, source_root, config.commit):
-                    info = build_project(config, source_root, output_dir, env, base_context)
+                if clone_repo(config.repo_url, config.branch, source_root, config.commit,
+                              config.sparse_paths()):
+                    # A clone is exactly its commit, so parse results can be reused
+                    info = build_project(config, source_root, output_dir, env, base_context,
+                                         cache_dir=cache_dir,
+                                         compress=args.compress)
                     projects_info.append(info)
                 else:
                     print(f"  Skipping {config.name} due to clone failure")
     
     # Build root index
     print("\nBuilding root index...")
-    build_root_index(projects_info, output_dir, env)
+    build_root_index(projects_info, output_dir, env, build_time.strftime('%Y-%m-%d %H:%M:%S'),
+                     args.compress)
     
     print(f"\nSite built successfully!")
     print(f"Output: {output_dir}")
@@ -0,0 +1,260 @@
+"""
+Line-level text helpers for parsing Coq sources.
+
+Kept in their own module, free of third-party imports and fully annotated,
+so that they can be compiled with mypyc (`make compile`). A compiled
+coq_text extension takes precedence over this file on import; without one
+the pure-Python version is used unchanged.
+"""
+
+import re
+from array import array
+from typing import List, Tuple
+
+
+# A file's content together with the offsets of its line starts
+SourceText = Tuple[str, 'array[int]']
+
+_WS_RE = re.compile(r'\s+')
+_PROOF_RE = re.compile(r'\bProof\b')
+_PROOF_KW_RE = re.compile(r'\bProof\.?')
+_QED_RE = re.compile(r'\b(Qed|Defined|Admitted)\b')
+_TRAIL_PROOF_RE = re.compile(r'\s*Proof\.?\s*$')
+_NEWLINE_RE = re.compile(r'\n')
+
+
+def _strip_coq_comments(s: str) -> str:
+    """Remove (* ... *) comments from a line, like _COMMENT_RE.sub('', s).
+    
+    Most lines have no comment at all, so check for that before scanning.
+    Comments are not nested; an unterminated one is left in place.
+    """
+    if '(*' not in s:
+        return s
+    out = []
+    i = 0
+    while True:
+        j = s.find('(*', i)
+        if j < 0:
+            out.append(s[i:])
+            break
+        k = s.find('*)', j + 2)
+        if k < 0:
+            out.append(s[i:])
+            break
+        out.append(s[i:j])
+        i = k + 2
+    return ''.join(out)
+
+
+def line_starts_of(content: str) -> 'array[int]':
+    """Offsets at which each line of content starts."""
+    starts = array('l', [0])
+    starts.extend(m.end() for m in _NEWLINE_RE.finditer(content))
+    return starts
+
+
+def count_lines(content: str) -> int:
+    """Number of lines in content, not counting an empty one after a final newline."""
+    if not content or content.endswith('\n'):
+        return content.count('\n')
+    return content.count('\n') + 1
+
+
+def _line(content: str, line_starts: 'array[int]', idx: int) -> str:
+    """Line idx of content, without its newline."""
+    return content[line_starts[idx]:_line_end(content, line_starts, idx)]
+
+
+def _line_end(content: str, line_starts: 'array[int]', idx: int) -> int:
+    """Offset of the newline ending line idx (or the end of content)."""
+    if idx + 1 < len(line_starts):
+        return line_starts[idx + 1] - 1
+    return len(content)
+
+
+# Line classification bits used by the proof scanners
+_BLANK = 1
+_STARTS_COMMENT = 2
+_HAS_PROOF = 4
+_HAS_QED = 8
+
+
+def _classify(line: str) -> int:
+    """Bitmask of the properties of a source line that the proof scanners test."""
+    s = line.strip()
+    if not s:
+        return _BLANK
+    flags = _STARTS_COMMENT if s.startswith('(*') else 0
+    code = _strip_coq_comments(s)
+    # Plain substring tests rule out most lines; the regexes only confirm
+    # word boundaries when a keyword is actually present
+    if 'Proof' in code and _PROOF_RE.search(code):
+        flags |= _HAS_PROOF
+    if ('Qed' in code or 'Defined' in code or 'Admitted' in code) and _QED_RE.search(code):
+        flags |= _HAS_QED
+    return flags
+
+
+def extract_preceding_comment(content: str, line_starts: 'array[int]', lemma_line_idx: int) -> str:
+    """Extract comment block immediately preceding a lemma."""
+    idx = lemma_line_idx - 1
+    
+    while idx >= 0 and _line(content, line_starts, idx).strip() == '':
+        idx -= 1
+    
+    if idx >= 0:
+        line = _line(content, line_starts, idx).strip()
+        if line.startswith('(*') and line.endswith('*)'):
+            return line[2:-2].strip()
+    
+    in_comment = False
+    comment_lines: List[str] = []
+    
+    while idx >= 0:
+        line = _line(content, line_starts, idx).strip()
+        
+        if line.endswith('*)') and not in_comment:
+            in_comment = True
+            text = line[:-2].strip() if line != '*)' else ''
+            if text:
+                comment_lines.insert(0, text)
+        elif line.startswith('(*') and in_comment:
+            text = line[2:].strip() if line != '(*' else ''
+            if text:
+                comment_lines.insert(0, text)
+            break
+        elif in_comment:
+            cleaned = line.lstrip('*').strip()
+            if cleaned:
+                comment_lines.insert(0, cleaned)
+        elif line == '':
+            if not in_comment:
+                break
+        else:
+            break
+        idx -= 1
+    
+    if comment_lines:
+        result = ' '.join(comment_lines)
+        result = _WS_RE.sub(' ', result)
+        return result
+    
+    return ''
+
+
+def extract_signature(content: str, line_starts: 'array[int]', start_idx: int) -> str:
+    """Extract the full signature of a lemma/theorem."""
+    signature_lines = []
+    idx = start_idx
+    paren_depth = 0
+    found_colon = False
+    
+    while idx < len(line_starts):
+        line = _line(content, line_starts, idx).strip()
+        line = _strip_coq_comments(line)
+        signature_lines.append(line)
+        
+        paren_depth += line.count('(') - line.count(')')
+        paren_depth += line.count('[') - line.count(']')
+        paren_depth += line.count('{') - line.count('}')
+        
+        if ':' in line:
+            found_colon = True
+        
+        if line.rstrip().endswith('.') and paren_depth <= 0 and found_colon:
+            break
+        
+        if 'Proof' in line or 'Proof.' in line:
+            signature_lines[-1] = _PROOF_KW_RE.sub('', signature_lines[-1]).strip()
+            break
+        
+        idx += 1
+        if idx - start_idx > 20:
+            break
+    
+    sig = ' '.join(signature_lines)
+    sig = _WS_RE.sub(' ', sig).strip()
+    sig = _TRAIL_PROOF_RE.sub('', sig)
+    return sig
+
+
+def count_proof_lines(content: str, line_starts: 'array[int]', start_idx: int) -> int:
+    """Count the number of lines in a proof."""
+    idx = start_idx
+    proof_started = False
+    proof_start_line = start_idx
+    
+    while idx < len(line_starts):
+        flags = _classify(_line(content, line_starts, idx))
+        
+        if flags & _HAS_PROOF:
+            proof_started = True
+            proof_start_line = idx
+            break
+        
+        if flags & _HAS_QED:
+            return 1
+        
+        idx += 1
+        if idx - start_idx > 30:
+            return 0
+    
+    if not proof_started:
+        return 0
+    
+    proof_lines = 0
+    idx = proof_start_line
+    
+    while idx < len(line_starts):
+        flags = _classify(_line(content, line_starts, idx))
+        
+        if not flags & (_BLANK | _STARTS_COMMENT):
+            proof_lines += 1
+        
+        if flags & _HAS_QED:
+            break
+        
+        idx += 1
+        if idx - proof_start_line > 500:
+            break
+    
+    return max(1, proof_lines)
+
+
+def extract_proof_body(content: str, line_starts: 'array[int]', start_idx: int) -> str:
+    """Extract the proof body from a lemma."""
+    idx = start_idx
+    proof_started = False
+    
+    while idx < len(line_starts):
+        line = _line(content, line_starts, idx)
+        flags = _classify(line)
+        
+        if flags & _HAS_PROOF:
+            proof_started = True
+            break
+        
+        if flags & _HAS_QED:
+            return line
+        
+        idx += 1
+        if idx - start_idx > 30:
+            return ''
+    
+    if not proof_started:
+        return ''
+    
+    # The body is the contiguous run of lines from Proof up to the
+    # terminator (or at most 500 lines past it), so slice it out directly
+    proof_start = idx
+    end = idx + 1
+    while end < len(line_starts):
+        if _classify(_line(content, line_starts, end)) & _HAS_QED:
+            break
+        if end - proof_start >= 500:
+            break
+        end += 1
+    end = min(end, len(line_starts) - 1)
+    
+    return content[line_starts[proof_start]:_line_end(content, line_starts, end)]
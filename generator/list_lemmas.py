@@ -16,15 +16,39 @@ Usage:
 
 import os
 import re
+import mmap
 import sys
 import argparse
+from bisect import bisect_right
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
 from pathlib import Path
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from datetime import datetime
 
 
-@dataclass
+_COMMENT_RE = re.compile(r'\(\*.*?\*\)')
+_WS_RE = re.compile(r'\s+')
+_PROOF_RE = re.compile(r'\bProof\.?')
+_PROOF_WORD_RE = re.compile(r'\bProof\b')
+_TRAIL_PROOF_RE = re.compile(r'\s*Proof\.?\s*$')
+_END_RE = re.compile(r'\b(Qed|Defined|Admitted)\b')
+
+# Declarations and section delimiters recognised by parse_coq_file, run
+# over the whole file at once. [^\S\n] keeps each match on a single line.
+_DECL_RE = re.compile(
+    r'^[^\S\n]*(?:'
+    r'(?P<kind>Lemma|Theorem|Corollary|Proposition|Fact|Remark)[^\S\n]+(?P<name>\w+)'
+    r'|Section[^\S\n]+(?P<section>\w+)[^\S\n]*\.'
+    r'|End[^\S\n]+(?P<end>\w+)[^\S\n]*\.)',
+    re.MULTILINE
+)
+_DECL_KEYWORDS = (b'Lemma', b'Theorem', b'Corollary', b'Proposition', b'Fact', b'Remark')
+
+
+@dataclass(slots=True, frozen=True)
 class LemmaInfo:
     file_name: str
     section: str
@@ -34,17 +58,22 @@ class LemmaInfo:
     proof_lines: int
 
 
-def extract_preceding_comment(lines: List[str], lemma_line_idx: int) -> str:
-    """Extract comment block immediately preceding a lemma."""
+def extract_preceding_comment(lines: List[str], lemma_line_idx: int,
+                              max_lookback: int = 60) -> str:
+    """Extract comment block immediately preceding a lemma.
+    
+    At most max_lookback lines above the lemma are examined.
+    """
     comments = []
     idx = lemma_line_idx - 1
+    stop = max(0, lemma_line_idx - max_lookback)
     
     # Skip blank lines
-    while idx >= 0 and lines[idx].strip() == '':
+    while idx >= stop and lines[idx].strip() == '':
         idx -= 1
     
     # Check for single-line comment
-    if idx >= 0:
+    if idx >= stop:
         line = lines[idx].strip()
         if line.startswith('(*') and line.endswith('*)'):
             # Single line comment
@@ -55,7 +84,7 @@ def extract_preceding_comment(lines: List[str], lemma_line_idx: int) -> str:
     in_comment = False
     comment_lines = []
     
-    while idx >= 0:
+    while idx >= stop:
         line = lines[idx].strip()
         
         if line.endswith('*)') and not in_comment:
@@ -88,7 +117,7 @@ def extract_preceding_comment(lines: List[str], lemma_line_idx: int) -> str:
         # Join comment lines
         result = ' '.join(comment_lines)
         # Remove multiple spaces
-        result = re.sub(r'\s+', ' ', result)
+        result = _WS_RE.sub(' ', result)
         return result
     
     return ''
@@ -96,7 +125,9 @@ def extract_preceding_comment(lines: List[str], lemma_line_idx: int) -> str:
 
 def extract_signature(lines: List[str], start_idx: int) -> str:
     """Extract the full signature of a lemma/theorem."""
-    signature_lines = []
+    # Whitespace-separated tokens of the signature; joining them with single
+    # spaces already normalises the whitespace
+    tokens = []
     idx = start_idx
     paren_depth = 0
     found_colon = False
@@ -105,41 +136,44 @@ def extract_signature(lines: List[str], start_idx: int) -> str:
         line = lines[idx].strip()
         
         # Remove comments from line
-        line = re.sub(r'\(\*.*?\*\)', '', line)
-        
-        signature_lines.append(line)
+        if '(*' in line:
+            line = _COMMENT_RE.sub('', line)
         
-        # Track parentheses
-        paren_depth += line.count('(') - line.count(')')
-        paren_depth += line.count('[') - line.count(']')
-        paren_depth += line.count('{') - line.count('}')
+        # Track parentheses (str.count beats a per-character loop here)
+        paren_depth += (line.count('(') + line.count('[') + line.count('{')
+                        - line.count(')') - line.count(']') - line.count('}'))
         
         if ':' in line:
             found_colon = True
         
         # End of signature: line ends with . and balanced parens
-        if line.rstrip().endswith('.') and paren_depth <= 0 and found_colon:
-            break
+        done = line.rstrip().endswith('.') and paren_depth <= 0 and found_colon
         
         # Also check for Proof keyword
-        if 'Proof' in line or 'Proof.' in line:
+        if not done and 'Proof' in line:
             # Remove Proof from last line
-            signature_lines[-1] = re.sub(r'\bProof\.?', '', signature_lines[-1]).strip()
+            line = _PROOF_RE.sub('', line)
+            done = True
+        
+        tokens.extend(line.split())
+        if done:
             break
         
         idx += 1
         if idx - start_idx > 20:  # Safety limit
             break
     
-    sig = ' '.join(signature_lines)
-    # Clean up
-    sig = re.sub(r'\s+', ' ', sig)
-    sig = sig.strip()
+    sig = ' '.join(tokens)
     # Remove trailing Proof if present
-    sig = re.sub(r'\s*Proof\.?\s*$', '', sig)
+    sig = _TRAIL_PROOF_RE.sub('', sig)
     return sig
 
 
+def _may_end_proof(line: str) -> bool:
+    """Cheap substring test that must pass before _END_RE can match."""
+    return 'Qed' in line or 'Defined' in line or 'Admitted' in line
+
+
 def count_proof_lines(lines: List[str], start_idx: int) -> int:
     """Count the number of lines in a proof (from Proof to Qed/Defined/Admitted)."""
     idx = start_idx
@@ -150,15 +184,15 @@ def count_proof_lines(lines: List[str], start_idx: int) -> int:
     while idx < len(lines):
         line = lines[idx].strip()
         # Remove comments
-        line_no_comment = re.sub(r'\(\*.*?\*\)', '', line)
+        line_no_comment = _COMMENT_RE.sub('', line) if '(*' in line else line
         
-        if re.search(r'\bProof\b', line_no_comment):
+        if _PROOF_WORD_RE.search(line_no_comment):
             proof_started = True
             proof_start_line = idx
             break
         
         # Check for end markers without Proof (one-liner proofs)
-        if re.search(r'\b(Qed|Defined|Admitted)\b', line_no_comment):
+        if _may_end_proof(line_no_comment) and _END_RE.search(line_no_comment):
             return 1  # One-liner proof
         
         idx += 1
@@ -174,16 +208,17 @@ def count_proof_lines(lines: List[str], start_idx: int) -> int:
     
     while idx < len(lines):
         line = lines[idx].strip()
-        # Remove comments for checking end markers
-        line_no_comment = re.sub(r'\(\*.*?\*\)', '', line)
         
         # Count non-empty, non-comment lines
         if line and not line.startswith('(*'):
             proof_lines += 1
         
-        # Check for end of proof
-        if re.search(r'\b(Qed|Defined|Admitted)\b', line_no_comment):
-            break
+        # Check for end of proof; comments are only removed (so markers
+        # inside them are ignored) when the line may hold a marker at all
+        if _may_end_proof(line):
+            line_no_comment = _COMMENT_RE.sub('', line) if '(*' in line else line
+            if _END_RE.search(line_no_comment):
+                break
         
         idx += 1
         if idx - proof_start_line > 500:  # Safety limit
@@ -197,13 +232,30 @@ def parse_coq_file(filepath: Path, base_dir: Path) -> List[LemmaInfo]:
     lemmas = []
     
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-            lines = content.split('\n')
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            # Map the file rather than reading it, and decode straight from
+            # the mapping so the raw bytes are never copied into memory
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # A file without any declaration keyword yields no lemmas,
+                # so don't bother decoding it
+                if all(mm.find(keyword) < 0 for keyword in _DECL_KEYWORDS):
+                    return []
+                content = str(mm, 'utf-8')
     except Exception as e:
         print(f"Warning: Could not read {filepath}: {e}", file=sys.stderr)
         return []
     
+    # Same newline handling as reading in text mode
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    # Split on '\n' only (not splitlines(), which also breaks on form feeds
+    # and Unicode separators) so line indices agree with the ^ anchors below
+    lines = content.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    
     # Get relative path from base directory
     try:
         relative_path = filepath.relative_to(base_dir)
@@ -213,76 +265,93 @@ def parse_coq_file(filepath: Path, base_dir: Path) -> List[LemmaInfo]:
     current_section = "Top-level"
     section_stack = ["Top-level"]
     
-    # Pattern for lemmas/theorems/corollaries
-    lemma_pattern = re.compile(
-        r'^\s*(Lemma|Theorem|Corollary|Proposition|Fact|Remark)\s+(\w+)',
-        re.MULTILINE
-    )
+    # Offset of the first character of each line, to map matches back to
+    # line indices
+    line_starts = list(accumulate((len(line) + 1 for line in lines), initial=0))
     
-    # Pattern for sections
-    section_start = re.compile(r'^\s*Section\s+(\w+)\s*\.', re.MULTILINE)
-    section_end = re.compile(r'^\s*End\s+(\w+)\s*\.', re.MULTILINE)
-    
-    for idx, line in enumerate(lines):
+    for match in _DECL_RE.finditer(content):
         # Track sections
-        section_match = section_start.match(line)
-        if section_match:
-            section_name = section_match.group(1)
+        kind = match.lastgroup
+        if kind == 'section':
+            section_name = match['section']
             section_stack.append(section_name)
             current_section = section_name
             continue
         
-        end_match = section_end.match(line)
-        if end_match:
+        if kind == 'end':
             if len(section_stack) > 1:
                 section_stack.pop()
                 current_section = section_stack[-1]
             continue
         
-        # Find lemmas
-        lemma_match = lemma_pattern.match(line)
-        if lemma_match:
-            lemma_type = lemma_match.group(1)
-            lemma_name = lemma_match.group(2)
-            
-            # Extract signature
-            signature = extract_signature(lines, idx)
-            
-            # Extract meaning from preceding comment
-            meaning = extract_preceding_comment(lines, idx)
-            
-            # Count proof lines
-            proof_lines = count_proof_lines(lines, idx)
-            
-            lemmas.append(LemmaInfo(
-                file_name=str(relative_path),
-                section=current_section,
-                name=lemma_name,
-                signature=signature,
-                meaning=meaning,
-                proof_lines=proof_lines
-            ))
-    
+        # Found a lemma
+        idx = bisect_right(line_starts, match.start()) - 1
+        lemma_type = match['kind']
+        lemma_name = match['name']
+        
+        # Extract signature
+        signature = extract_signature(lines, idx)
+        
+        # Extract meaning from preceding comment
+        meaning = extract_preceding_comment(lines, idx)
+        
+        # Count proof lines
+        proof_lines = count_proof_lines(lines, idx)
+        
+        lemmas.append(LemmaInfo(
+            file_name=str(relative_path),
+            section=current_section,
+            name=lemma_name,
+            signature=signature,
+            meaning=meaning,
+            proof_lines=proof_lines
+        ))
+        
     return lemmas
 
 
-def format_table_markdown(lemmas: List[LemmaInfo]) -> str:
-    """Format lemmas as a Markdown table."""
-    lines = []
-    lines.append("| File | Section | Name | Lines | Signature | Meaning |")
-    lines.append("|------|---------|------|------:|-----------|---------|")
+def find_v_files(root: Path, recursive: bool) -> Iterator[Path]:
+    """Yield the .v files in root, descending into subdirectories if recursive.
+    
+    Like Path.rglob, symlinked directories are not followed and unreadable
+    directories are skipped.
+    """
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    elif entry.name.endswith('.v'):
+                        yield Path(entry.path)
+        except OSError:
+            continue
+
+
+# The iter_table_* functions yield the output in chunks so main() can write
+# it as it is produced; the format_table_* wrappers return it as one string.
+
+def iter_table_markdown(lemmas: List[LemmaInfo]) -> Iterator[str]:
+    """Yield lemmas as a Markdown table, one line at a time."""
+    yield "| File | Section | Name | Lines | Signature | Meaning |"
+    yield "\n|------|---------|------|------:|-----------|---------|"
     
     for l in lemmas:
         # Escape pipe characters
         sig = l.signature.replace('|', '\\|')
         meaning = l.meaning.replace('|', '\\|')
-        lines.append(f"| {l.file_name} | {l.section} | `{l.name}` | {l.proof_lines} | `{sig}` | {meaning} |")
-    
-    return '\n'.join(lines)
+        yield f"\n| {l.file_name} | {l.section} | `{l.name}` | {l.proof_lines} | `{sig}` | {meaning} |"
 
 
-def format_table_csv(lemmas: List[LemmaInfo]) -> str:
-    """Format lemmas as CSV."""
+def format_table_markdown(lemmas: List[LemmaInfo]) -> str:
+    """Format lemmas as a Markdown table."""
+    return ''.join(iter_table_markdown(lemmas))
+
+
+def iter_table_csv(lemmas: List[LemmaInfo]) -> Iterator[str]:
+    """Yield lemmas as CSV, a block of rows at a time."""
     import csv
     import io
     
@@ -292,50 +361,81 @@ def format_table_csv(lemmas: List[LemmaInfo]) -> str:
     
     for l in lemmas:
         writer.writerow([l.file_name, l.section, l.name, l.proof_lines, l.signature, l.meaning])
+        if output.tell() >= 65536:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
     
-    return output.getvalue()
+    yield output.getvalue()
 
 
-def format_table_tsv(lemmas: List[LemmaInfo]) -> str:
-    """Format lemmas as TSV (tab-separated)."""
-    lines = []
-    lines.append("File\tSection\tName\tProofLines\tSignature\tMeaning")
+def format_table_csv(lemmas: List[LemmaInfo]) -> str:
+    """Format lemmas as CSV."""
+    return ''.join(iter_table_csv(lemmas))
+
+
+def iter_table_tsv(lemmas: List[LemmaInfo]) -> Iterator[str]:
+    """Yield lemmas as TSV (tab-separated), one line at a time."""
+    yield "File\tSection\tName\tProofLines\tSignature\tMeaning"
     
     for l in lemmas:
         sig = l.signature.replace('\t', ' ')
         meaning = l.meaning.replace('\t', ' ')
-        lines.append(f"{l.file_name}\t{l.section}\t{l.name}\t{l.proof_lines}\t{sig}\t{meaning}")
-    
-    return '\n'.join(lines)
+        yield f"\n{l.file_name}\t{l.section}\t{l.name}\t{l.proof_lines}\t{sig}\t{meaning}"
+
+
+def format_table_tsv(lemmas: List[LemmaInfo]) -> str:
+    """Format lemmas as TSV (tab-separated)."""
+    return ''.join(iter_table_tsv(lemmas))
+
+
+_HTML_ESCAPES = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#39;',
+})
 
 
 def escape_html(text: str) -> str:
     """Escape HTML special characters."""
-    return (text
-            .replace('&', '&amp;')
-            .replace('<', '&lt;')
-            .replace('>', '&gt;')
-            .replace('"', '&quot;')
-            .replace("'", '&#39;'))
+    return text.translate(_HTML_ESCAPES)
 
 
-def format_table_html(lemmas: List[LemmaInfo], title: str = "Coq Lemma Statistics") -> str:
-    """Format lemmas as a standalone HTML page suitable for GitHub Pages."""
+def _row(l: LemmaInfo, search_key: str, section: str) -> str:
+    """Render one lemma's table row; search_key and section are already escaped."""
+    return f'''
+                            <tr data-search="{search_key}">
+                                <td class="lemma-name">{escape_html(l.name)}</td>
+                                <td class="section-name">{section}</td>
+                                <td class="proof-lines">{l.proof_lines}</td>
+                                <td><code class="signature">{escape_html(l.signature)}</code></td>
+                                <td class="meaning">{escape_html(l.meaning)}</td>
+                            </tr>
+'''
+
+
+def iter_table_html(lemmas: List[LemmaInfo], title: str = "Coq Lemma Statistics") -> Iterator[str]:
+    """Yield a standalone HTML page for the lemmas, one block at a time."""
     
-    # Group lemmas by file for better organization
-    files = {}
+    # Group lemmas by file for better organization, each paired with the
+    # escaped lower-case text the search box matches against
+    files = defaultdict(list)
     for l in lemmas:
-        if l.file_name not in files:
-            files[l.file_name] = []
-        files[l.file_name].append(l)
+        search_key = escape_html(f"{l.name} {l.signature} {l.meaning}".lower())
+        files[l.file_name].append((l, search_key))
     
     # Calculate statistics
     total_lemmas = len(lemmas)
     total_files = len(files)
     total_proof_lines = sum(l.proof_lines for l in lemmas)
     
+    # Only a handful of section names recur across all lemmas; escape each once
+    section_html = {section: escape_html(section) for section in {l.section for l in lemmas}}
+    
     # Build HTML
-    html = f'''<!DOCTYPE html>
+    yield f'''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -598,12 +698,12 @@ def format_table_html(lemmas: List[LemmaInfo], title: str = "Coq Lemma Statistic
 '''
     
     # Add each file section
-    for file_name in sorted(files.keys()):
-        file_lemmas = files[file_name]
-        html += f'''
-            <div class="file-section" data-file="{escape_html(file_name)}">
+    for file_name, file_lemmas in sorted(files.items()):
+        file_html = escape_html(file_name)
+        yield f'''
+            <div class="file-section" data-file="{file_html}">
                 <div class="file-header" onclick="toggleSection(this)">
-                    <span class="file-name">{escape_html(file_name)}</span>
+                    <span class="file-name">{file_html}</span>
                     <span class="file-count">{len(file_lemmas)} lemmas</span>
                 </div>
                 <div class="file-content">
@@ -619,24 +719,16 @@ def format_table_html(lemmas: List[LemmaInfo], title: str = "Coq Lemma Statistic
                         </thead>
                         <tbody>
 '''
-        for l in file_lemmas:
-            html += f'''
-                            <tr data-search="{escape_html((l.name + ' ' + l.signature + ' ' + l.meaning).lower())}">
-                                <td class="lemma-name">{escape_html(l.name)}</td>
-                                <td class="section-name">{escape_html(l.section)}</td>
-                                <td class="proof-lines">{l.proof_lines}</td>
-                                <td><code class="signature">{escape_html(l.signature)}</code></td>
-                                <td class="meaning">{escape_html(l.meaning)}</td>
-                            </tr>
-'''
-        html += '''
+        yield ''.join(_row(l, search_key, section_html[l.section])
+                      for l, search_key in file_lemmas)
+        yield '''
                         </tbody>
                     </table>
                 </div>
             </div>
 '''
     
-    html += f'''
+    yield f'''
         </div>
         
         <div class="timestamp">
@@ -697,8 +789,11 @@ def format_table_html(lemmas: List[LemmaInfo], title: str = "Coq Lemma Statistic
 </body>
 </html>
 '''
-    
-    return html
+
+
+def format_table_html(lemmas: List[LemmaInfo], title: str = "Coq Lemma Statistics") -> str:
+    """Format lemmas as a standalone HTML page suitable for GitHub Pages."""
+    return ''.join(iter_table_html(lemmas, title))
 
 
 def main():
@@ -731,6 +826,8 @@ def main():
     
     all_lemmas = []
     total_files = 0
+    v_paths = []
+    base_dirs = []
     
     for dir_path in args.directories:
         target = Path(dir_path)
@@ -739,10 +836,7 @@ def main():
             continue
         
         # Find all .v files
-        if args.recursive:
-            v_files = list(target.rglob('*.v'))
-        else:
-            v_files = list(target.glob('*.v'))
+        v_files = list(find_v_files(target, args.recursive))
         
         if not v_files:
             print(f"Warning: No .v files found in {target}", file=sys.stderr)
@@ -750,26 +844,35 @@ def main():
         
         total_files += len(v_files)
         
-        # Parse all files
         for vfile in sorted(v_files):
-            lemmas = parse_coq_file(vfile, target)
-            all_lemmas.extend(lemmas)
+            v_paths.append(vfile)
+            base_dirs.append(target)
+    
+    # Parse all files; they are independent, and map() keeps results in order
+    if v_paths:
+        with ProcessPoolExecutor() as ex:
+            for lemmas in ex.map(parse_coq_file, v_paths, base_dirs, chunksize=8):
+                all_lemmas.extend(lemmas)
     
     if not all_lemmas:
         print("Error: No lemmas found in any directory", file=sys.stderr)
         sys.exit(1)
     
-    # Format output
+    # Format output, writing it out as it is produced
     if args.format == 'csv':
-        output = format_table_csv(all_lemmas)
+        chunks = iter_table_csv(all_lemmas)
     elif args.format == 'tsv':
-        output = format_table_tsv(all_lemmas)
+        chunks = iter_table_tsv(all_lemmas)
     elif args.format == 'html':
-        output = format_table_html(all_lemmas, args.title)
+        chunks = iter_table_html(all_lemmas, args.title)
     else:
-        output = format_table_markdown(all_lemmas)
+        chunks = iter_table_markdown(all_lemmas)
     
-    print(output)
+    write = sys.stdout.write
+    for chunk in chunks:
+        write(chunk)
+    write('\n')
+    sys.stdout.flush()
     print(f"\n# Total: {len(all_lemmas)} lemmas in {total_files} files", file=sys.stderr)
 
 